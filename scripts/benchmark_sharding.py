@@ -0,0 +1,81 @@
+import argparse
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from data_processor import DataProcessor  # noqa: E402
+
+def generate_transactions(path, num_records):
+    # Transaction records shaped like generate_sample_data.py's, at scale
+    start = datetime(2023, 1, 1)
+    df = pd.DataFrame({
+        'TransactionID': [f'TRX{str(i).zfill(8)}' for i in range(num_records)],
+        'CustomerID': [f'CUST{str(random.randint(0, 9999)).zfill(6)}' for _ in range(num_records)],
+        'Amount': [round(random.uniform(5, 500), 3) for _ in range(num_records)],
+        'TransactionDate': [start + timedelta(minutes=random.randint(0, 525600)) for _ in range(num_records)],
+        'PaymentMethod': [random.choice(['Credit Card', 'PayPal', 'Bank Transfer']) for _ in range(num_records)],
+        'Status': [random.choice(['Completed', 'Pending', 'Refunded ']) for _ in range(num_records)],
+    })
+    df.to_excel(path, index=False)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare reading one large workbook in one piece and in shards")
+    parser.add_argument('--rows', type=int, default=200000, help="rows in the generated workbook")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes for the sharded read")
+    parser.add_argument('--shard-rows', type=int, default=25000, help="rows per shard")
+    parser.add_argument('--file', help="benchmark this transaction workbook instead of generating one")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.file
+        if path is None:
+            path = os.path.join(temp_dir, 'transaction_data.xlsx')
+            print(f"Generating {args.rows} rows...")
+            generate_transactions(path, args.rows)
+        
+        single = DataProcessor(workers=1)
+        sharded = DataProcessor(workers=args.workers, shard_rows=args.shard_rows)
+        
+        expected, single_time = timed(single.excel_handler.read_excel, path)
+        
+        # Time the steps that stay in the parent process: splitting the
+        # sheet, moving each chunk to a worker and its rows back, and
+        # building the frame from all rows
+        chunks, split_time = timed(lambda: list(sharded.excel_handler.split_sheet(path, 0, args.shard_rows)))
+        rows = sharded.excel_handler.parse_chunk(path, 0, *chunks[1])
+        _, transfer_time = timed(lambda: pickle.loads(pickle.dumps((chunks[1], rows))))
+        transfer_time *= len(chunks)
+        all_rows = expected.astype(object).where(expected.notna(), "").values.tolist()
+        _, build_time = timed(sharded.excel_handler.rows_to_frame, chunks[0][0], all_rows)
+        del chunks, rows, all_rows
+        
+        df, sharded_time = timed(sharded.read_sharded, path, 0)
+        if df is None:
+            sys.exit(f"{path} was not sharded; lower --shard-rows")
+        pd.testing.assert_frame_equal(df, expected)
+        
+        serial = split_time + transfer_time + build_time
+        print(f"CPUs available: {os.cpu_count()}, workers: {args.workers}, rows per shard: {args.shard_rows}")
+        print(f"Single-process read:    {single_time:.2f}s")
+        print(f"Sharded read:           {sharded_time:.2f}s ({single_time / sharded_time:.2f}x)")
+        print(f"  in the parent:        {serial:.2f}s (split {split_time:.2f}s, transfer {transfer_time:.2f}s, "
+              f"build frame {build_time:.2f}s)")
+        print(f"Serial fraction {serial / single_time:.0%}: at most "
+              f"{single_time / (serial + (single_time - serial) / args.workers):.2f}x with {args.workers} CPUs")
+        print("Sharded output matches the single-process read")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import json
+import logging
+from datetime import datetime
+from utils import atomic_path
+
+class ProcessingJournal:
+    """Record which input files have been fully processed so a run can resume"""
+    
+    def __init__(self, journal_path):
+        self.logger = logging.getLogger(__name__)
+        self.journal_path = journal_path
+        self.entries = self.load()
+    
+    def load(self):
+        """Load completed entries from disk, starting fresh if there are none"""
+        if not os.path.exists(self.journal_path):
+            return {}
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable journal {self.journal_path}: {str(e)}")
+            return {}
+    
+    @staticmethod
+    def fingerprint(file_path):
+        """Identify a version of an input file by its size and modification time"""
+        stat = os.stat(file_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+    
+    def is_complete(self, file, file_path, formats):
+        """Check whether this version of the file was already written in these formats"""
+        entry = self.entries.get(file)
+        if not entry:
+            return False
+        return (entry.get('fingerprint') == self.fingerprint(file_path)
+                and set(entry.get('formats', [])) >= set(formats))
+    
+    def record(self, file, file_path, formats, outputs, summary):
+        """Mark a file as complete and persist the journal atomically"""
+        self.entries[file] = {
+            'fingerprint': self.fingerprint(file_path),
+            'formats': list(formats),
+            'outputs': outputs,
+            'summary': summary,
+            'completed_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.save()
+    
+    def save(self):
+        """Write the journal durably via a temporary file and rename"""
+        with atomic_path(self.journal_path) as temp_path:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+    
+    def clear(self):
+        """Remove the journal once a run has finished cleanly"""
+        self.entries = {}
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
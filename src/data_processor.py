@@ -1,128 +1,272 @@
 import os
-import pandas as pd
-import numpy as np
-from datetime import datetime
+import argparse
 import logging
+from datetime import datetime
 from excel_handler import ExcelHandler
-from utils import create_directories
+from db_handler import DatabaseHandler, ENGINES
+from checkpoint import ProcessingJournal
+from utils import atomic_path, create_directories, get_file_type, process_pool, retry, setup_logging
+
+# pandas and the process pool are imported inside the functions that need
+# them so that short-lived invocations (--help, health checks) don't pay
+# their import cost.
+
+# Sheets to read for files whose data is not on the first sheet
+DEFAULT_SHEETS = {
+    'shipping_data.xlsx': 'Shipping Records',
+}
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('data/output/processing.log', encoding='utf-8')
-    ]
-)
+OUTPUT_FORMATS = ('xlsx', 'csv', 'db')
+
+# Records completed files in the output directory so interrupted runs can resume
+JOURNAL_FILE = 'processing_journal.json'
 
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, output_dir=os.path.join('data', 'output'), formats=('xlsx',),
+                 workers=1, sheet_config=None, db_path=None, db_engine='auto',
+                 resume=True, retries=3, retry_backoff=1.0, shard_rows=0):
         self.excel_handler = ExcelHandler()
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.db_handler = None
+        if 'db' in self.formats:
+            self.db_handler = DatabaseHandler(db_path, engine=db_engine, output_dir=output_dir)
+        self.workers = max(1, workers)
+        self.resume = resume
+        self.retries = max(1, retries)
+        self.retry_backoff = retry_backoff
+        self.shard_rows = shard_rows
+        self.sheet_config = dict(DEFAULT_SHEETS)
+        if sheet_config:
+            self.sheet_config.update(sheet_config)
         self.setup_environment()
         
     def setup_environment(self):
-        """Set up necessary directories and logging"""
-        create_directories()
+        """Set up necessary directories"""
+        create_directories([self.output_dir])
         
     def process_files(self, input_dir):
         """Process all Excel files in the input directory"""
         logger = logging.getLogger(__name__)
         logger.info("Starting data processing pipeline")
         
+        if not os.path.isdir(input_dir):
+            logger.error(f"Input directory not found: {input_dir}")
+            return
+        
         # Get all Excel files
-        excel_files = [f for f in os.listdir(input_dir) if f.endswith(('.xlsx', '.xls'))]
+        excel_files = sorted(f for f in os.listdir(input_dir) if f.endswith(('.xlsx', '.xls')))
         if not excel_files:
             logger.warning("No Excel files found in input directory")
             return
             
         logger.info(f"Found {len(excel_files)} Excel files to process: {', '.join(excel_files)}")
         
-        # Process each file
+        # Skip files completed by an earlier, interrupted run
+        journal = ProcessingJournal(os.path.join(self.output_dir, JOURNAL_FILE))
+        if not self.resume:
+            journal.clear()
+        pending_files = [f for f in excel_files
+                         if not journal.is_complete(f, os.path.join(input_dir, f), self.formats)]
+        skipped_count = len(excel_files) - len(pending_files)
+        if skipped_count:
+            logger.info(f"Resuming: skipping {skipped_count} files already completed")
+        
+        # Process each file, committing its output as soon as it is ready
         processed_data = {}
-        error_count = 0
-        success_count = 0
-        
-        for file in excel_files:
-            try:
-                logger.info(f"\n{'='*50}")
-                logger.info(f"Processing file: {file}")
-                file_path = os.path.join(input_dir, file)
-                
-                # Read the file
-                try:
-                    if file == 'shipping_data.xlsx':
-                        logger.info("Reading shipping data from 'Shipping Records' sheet")
-                        df = self.excel_handler.read_excel(file_path, sheet_name='Shipping Records')
-                    else:
-                        df = self.excel_handler.read_excel(file_path)
-                    
-                    logger.info(f"Successfully read file with {len(df)} records and {len(df.columns)} columns")
-                    logger.info(f"Columns: {', '.join(df.columns)}")
-                except Exception as e:
-                    logger.error(f"Error reading file {file}: {str(e)}")
-                    error_count += 1
-                    continue
-                
-                # Apply appropriate cleaning based on file type
-                try:
-                    initial_count = len(df)
-                    if 'customer' in file.lower():
-                        logger.info("Applying customer data cleaning")
-                        df = self.clean_customer_data(df)
-                    elif 'transaction' in file.lower():
-                        logger.info("Applying transaction data cleaning")
-                        df = self.clean_transaction_data(df)
-                    elif 'inventory' in file.lower():
-                        logger.info("Applying inventory data cleaning")
-                        df = self.clean_inventory_data(df)
-                    elif 'shipping' in file.lower():
-                        logger.info("Applying shipping data cleaning")
-                        df = self.clean_shipping_data(df)
-                    elif 'review' in file.lower():
-                        logger.info("Applying review data cleaning")
-                        df = self.clean_review_data(df)
-                    elif 'error' in file.lower():
-                        logger.info("Applying error log cleaning")
-                        df = self.clean_error_logs(df)
-                    else:
-                        logger.info("Applying general data cleaning")
-                        df = self.clean_data(df)
-                    
-                    final_count = len(df)
-                    records_removed = initial_count - final_count
-                    logger.info(f"Cleaning complete: {records_removed} records removed")
-                    logger.info(f"Final record count: {final_count}")
-                    
-                except Exception as e:
-                    logger.error(f"Error cleaning file {file}: {str(e)}")
-                    error_count += 1
-                    continue
-                
-                processed_data[file] = df
-                success_count += 1
-                logger.info(f"Successfully processed {file}")
-                
-            except Exception as e:
-                logger.error(f"Unexpected error processing {file}: {str(e)}")
-                error_count += 1
-                continue
+        try:
+            # When sharding, the workers are used within each file instead
+            if self.workers > 1 and not self.shard_rows and len(pending_files) > 1:
+                logger.info(f"Processing with {self.workers} worker processes")
+                with process_pool(self.workers) as executor:
+                    results = executor.map(self.process_file, pending_files, [input_dir] * len(pending_files))
+                    for file, df in zip(pending_files, results):
+                        if self.commit_file(journal, file, input_dir, df):
+                            processed_data[file] = df
+            else:
+                for file in pending_files:
+                    df = self.process_file(file, input_dir)
+                    if self.commit_file(journal, file, input_dir, df):
+                        processed_data[file] = df
+        finally:
+            if self.db_handler:
+                self.db_handler.close()
+        
+        success_count = len(processed_data)
+        error_count = len(pending_files) - success_count
         
         logger.info(f"\n{'='*50}")
         logger.info(f"Processing complete:")
         logger.info(f"Successfully processed: {success_count} files")
+        logger.info(f"Skipped (already completed): {skipped_count} files")
         logger.info(f"Errors encountered: {error_count} files")
         
-        # Save processed data
-        if processed_data:
-            self.save_processed_data(processed_data)
+        # Summarize every completed file, including those from earlier runs
+        completed = {f: journal.entries[f]['summary'] for f in excel_files if f in journal.entries}
+        if completed:
+            self.write_summary(completed)
         else:
             logger.error("No files were successfully processed")
         
+        # A clean run leaves nothing to resume; otherwise keep the journal so
+        # the next run only retries the files that failed
+        if error_count == 0:
+            journal.clear()
+        
         return processed_data
     
+    def commit_file(self, journal, file, input_dir, df):
+        """Save one processed file and record it in the journal"""
+        if df is None:
+            return False
+        logger = logging.getLogger(__name__)
+        try:
+            outputs = self.save_output(df, file)
+            for output_file in outputs:
+                logger.info(f"Saved processed data to {output_file}")
+            journal.record(file, os.path.join(input_dir, file), self.formats,
+                           outputs, self.summarize(file, df))
+            return True
+        except Exception as e:
+            logger.error(f"Error saving file {file}: {str(e)}")
+            return False
+    
+    def process_file(self, file, input_dir):
+        """Read and clean a single file, returning None on failure"""
+        logger = logging.getLogger(__name__)
+        try:
+            logger.info(f"\n{'='*50}")
+            logger.info(f"Processing file: {file}")
+            file_path = os.path.join(input_dir, file)
+            
+            # Read the file
+            try:
+                sheet_name = self.sheet_config.get(file, 0)
+                if sheet_name != 0:
+                    logger.info(f"Reading {file} from '{sheet_name}' sheet")
+                # Retry transient I/O errors, e.g. a file locked by Excel or
+                # a flaky network share
+                df = None
+                if self.should_shard(file):
+                    df = retry(self.read_sharded, file_path, sheet_name,
+                               attempts=self.retries, backoff=self.retry_backoff)
+                if df is None:
+                    df = retry(self.excel_handler.read_excel, file_path, sheet_name=sheet_name,
+                               attempts=self.retries, backoff=self.retry_backoff)
+                
+                logger.info(f"Successfully read file with {len(df)} records and {len(df.columns)} columns")
+                logger.info(f"Columns: {', '.join(map(str, df.columns))}")
+            except Exception as e:
+                logger.error(f"Error reading file {file}: {str(e)}")
+                return None
+            
+            # Apply appropriate cleaning based on file type
+            try:
+                initial_count = len(df)
+                df = self.clean_by_type(file, df)
+                
+                final_count = len(df)
+                records_removed = initial_count - final_count
+                logger.info(f"Cleaning complete: {records_removed} records removed")
+                logger.info(f"Final record count: {final_count}")
+                
+            except Exception as e:
+                logger.error(f"Error cleaning file {file}: {str(e)}")
+                return None
+            
+            logger.info(f"Successfully processed {file}")
+            return df
+            
+        except Exception as e:
+            logger.error(f"Unexpected error processing {file}: {str(e)}")
+            return None
+    
+    def clean_by_type(self, file, df):
+        """Apply the cleaning appropriate for the file type"""
+        logger = logging.getLogger(__name__)
+        file_type = get_file_type(file)
+        if file_type == 'customer':
+            logger.info("Applying customer data cleaning")
+            df = self.clean_customer_data(df)
+        elif file_type == 'transaction':
+            logger.info("Applying transaction data cleaning")
+            df = self.clean_transaction_data(df)
+        elif file_type == 'inventory':
+            logger.info("Applying inventory data cleaning")
+            df = self.clean_inventory_data(df)
+        elif file_type == 'shipping':
+            logger.info("Applying shipping data cleaning")
+            df = self.clean_shipping_data(df)
+        elif file_type == 'review':
+            logger.info("Applying review data cleaning")
+            df = self.clean_review_data(df)
+        elif file_type == 'error':
+            logger.info("Applying error log cleaning")
+            df = self.clean_error_logs(df)
+        else:
+            logger.info("Applying general data cleaning")
+            df = self.clean_data(df)
+        return df
+    
+    def should_shard(self, file):
+        """Check whether a file should be read in row shards"""
+        return self.shard_rows > 0 and self.workers > 1 and file.lower().endswith('.xlsx')
+    
+    def read_sharded(self, file_path, sheet_name):
+        """Read a sheet by parsing chunks of its rows in worker processes
+        
+        The parent only splits the sheet's XML on row boundaries and builds
+        the DataFrame from the parsed rows, so column types are inferred
+        once over the whole sheet. Parsing the cells, which is most of the
+        cost of reading a workbook, runs in parallel. Returns None when the
+        sheet fits in one shard or can't be split, so the caller reads it in
+        one piece.
+        
+        Splitting and parsing use openpyxl internals (see split_sheet()), so
+        errors from an openpyxl version that changed them also fall back to
+        a normal read rather than failing the file.
+        """
+        from collections import deque
+        from itertools import chain
+        
+        logger = logging.getLogger(__name__)
+        chunks = self.excel_handler.split_sheet(file_path, sheet_name, self.shard_rows)
+        results = []
+        try:
+            first_chunks = [chunk for chunk in (next(chunks, None), next(chunks, None)) if chunk]
+            if len(first_chunks) < 2:
+                return None
+            header = first_chunks[0][0]
+            with process_pool(self.workers) as executor:
+                pending = deque()
+                for chunk in chain(first_chunks, chunks):
+                    pending.append(executor.submit(self.excel_handler.parse_chunk,
+                                                   file_path, sheet_name, *chunk))
+                    # Bound the number of chunks held in memory at once
+                    if len(pending) >= self.workers * 2:
+                        results.append(pending.popleft().result())
+                results.extend(future.result() for future in pending)
+        except (ValueError, ImportError, AttributeError, KeyError, TypeError) as e:
+            logger.warning(f"Cannot shard {file_path}, reading it in one piece: "
+                           f"{type(e).__name__}: {str(e)}")
+            return None
+        finally:
+            chunks.close()
+        logger.info(f"Read {file_path} in {len(results)} shards")
+        
+        # Blank rows between shards are kept, as read_excel keeps all but
+        # the trailing ones
+        rows = []
+        for position, shard_rows in results:
+            if shard_rows:
+                rows.extend([""] * len(header) for _ in range(position - len(rows)))
+                rows.extend(shard_rows)
+        return self.excel_handler.rows_to_frame(header, rows)
+    
     def clean_customer_data(self, df):
         """Clean customer-specific data"""
+        import pandas as pd
+        
         df = self.clean_data(df)
         
         # Standardize email addresses
@@ -141,6 +285,8 @@ class DataProcessor:
     
     def clean_transaction_data(self, df):
         """Clean transaction-specific data"""
+        import pandas as pd
+        
         df = self.clean_data(df)
         
         # Round amounts to 2 decimal places
@@ -155,6 +301,8 @@ class DataProcessor:
     
     def clean_shipping_data(self, df):
         """Clean shipping-specific data"""
+        import pandas as pd
+        
         df = self.clean_data(df)
         
         # Standardize addresses
@@ -191,6 +339,8 @@ class DataProcessor:
     
     def clean_error_logs(self, df):
         """Clean error log data"""
+        import pandas as pd
+        
         df = self.clean_data(df)
         
         # Ensure timestamp is datetime
@@ -205,6 +355,8 @@ class DataProcessor:
     
     def clean_inventory_data(self, df):
         """Clean inventory-specific data"""
+        import pandas as pd
+        
         df = self.clean_data(df)
         
         # Ensure numeric columns are integers
@@ -229,6 +381,7 @@ class DataProcessor:
     
     def standardize_phone(self, phone):
         """Standardize phone number format"""
+        import pandas as pd
         if pd.isna(phone):
             return None
         # Remove all non-numeric characters
@@ -241,6 +394,7 @@ class DataProcessor:
     
     def clean_text(self, text):
         """Clean text data"""
+        import pandas as pd
         if pd.isna(text):
             return None
         # Fix common typos
@@ -249,57 +403,151 @@ class DataProcessor:
         text = ' '.join(text.split())
         return text
     
-    def save_processed_data(self, processed_data):
-        """Save all processed data"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def summarize(self, filename, df):
+        """Build the summary report lines for one processed file"""
+        lines = [
+            f"Records processed: {len(df)}",
+            f"Columns: {', '.join(map(str, df.columns))}",
+        ]
+        
+        # Add specific statistics based on file type
+        if 'customer' in filename.lower():
+            null_phones = df['Phone'].isna().sum()
+            lines.append(f"Missing phone numbers: {null_phones}")
+            
+        elif 'transaction' in filename.lower():
+            total_amount = df['Amount'].sum() if 'Amount' in df.columns else 0
+            lines.append(f"Total transaction amount: ${total_amount:,.2f}")
+            
+        elif 'shipping' in filename.lower() and 'InvalidDates' in df.columns:
+            invalid_dates = df['InvalidDates'].sum()
+            lines.append(f"Invalid shipping dates found: {invalid_dates}")
+            
+        elif 'review' in filename.lower() and 'Rating' in df.columns:
+            avg_rating = df['Rating'].mean()
+            lines.append(f"Average rating: {avg_rating:.2f}")
+            
+        elif 'inventory' in filename.lower():
+            low_stock = df[df['InStock'] <= df['ReorderPoint']].shape[0]
+            lines.append(f"Products below reorder point: {low_stock}")
         
-        # Save individual files
-        for filename, df in processed_data.items():
-            output_file = os.path.join('data', 'output', f'processed_{filename}')
-            self.excel_handler.save_excel(df, output_file)
-            logger = logging.getLogger(__name__)
-            logger.info(f"Saved processed data to {output_file}")
+        return lines
+    
+    def write_summary(self, summaries):
+        """Write the processing summary report from per-file summary lines"""
+        logger = logging.getLogger(__name__)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Create a summary report
-        summary_file = os.path.join('data', 'output', f'processing_summary_{timestamp}.txt')
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write("Data Processing Summary\n")
-            f.write("=====================\n\n")
-            
-            for filename, df in processed_data.items():
-                f.write(f"\nFile: {filename}\n")
-                f.write(f"Records processed: {len(df)}\n")
-                f.write(f"Columns: {', '.join(df.columns)}\n")
+        summary_file = os.path.join(self.output_dir, f'processing_summary_{timestamp}.txt')
+        with atomic_path(summary_file) as temp_path:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write("Data Processing Summary\n")
+                f.write("=====================\n\n")
                 
-                # Add specific statistics based on file type
-                if 'customer' in filename.lower():
-                    null_phones = df['Phone'].isna().sum()
-                    f.write(f"Missing phone numbers: {null_phones}\n")
-                    
-                elif 'transaction' in filename.lower():
-                    total_amount = df['Amount'].sum() if 'Amount' in df.columns else 0
-                    f.write(f"Total transaction amount: ${total_amount:,.2f}\n")
-                    
-                elif 'shipping' in filename.lower() and 'InvalidDates' in df.columns:
-                    invalid_dates = df['InvalidDates'].sum()
-                    f.write(f"Invalid shipping dates found: {invalid_dates}\n")
-                    
-                elif 'review' in filename.lower() and 'Rating' in df.columns:
-                    avg_rating = df['Rating'].mean()
-                    f.write(f"Average rating: {avg_rating:.2f}\n")
-                    
-                elif 'inventory' in filename.lower():
-                    low_stock = df[df['InStock'] <= df['ReorderPoint']].shape[0]
-                    f.write(f"Products below reorder point: {low_stock}\n")
-                
-                f.write("-" * 50 + "\n")
+                for filename, lines in summaries.items():
+                    f.write(f"\nFile: {filename}\n")
+                    for line in lines:
+                        f.write(f"{line}\n")
+                    f.write("-" * 50 + "\n")
         
         logger.info(f"Created processing summary: {summary_file}")
+    
+    def save_output(self, df, filename):
+        """Write one processed file in every configured format, returning the paths"""
+        stem = os.path.splitext(filename)[0]
+        output_files = []
+        for fmt in self.formats:
+            # Files are written under a temporary name and renamed into
+            # place, so an interrupted run never leaves a partial output
+            if fmt == 'xlsx':
+                output_file = os.path.join(self.output_dir, f'processed_{filename}')
+                with atomic_path(output_file) as temp_path:
+                    self.excel_handler.save_excel(df, temp_path)
+            elif fmt == 'csv':
+                output_file = os.path.join(self.output_dir, f'processed_{stem}.csv')
+                with atomic_path(output_file) as temp_path:
+                    self.excel_handler.save_csv(df, temp_path)
+            elif fmt == 'db':
+                # Written in one transaction that upserts keyed rows and
+                # replaces the rest, so replaying a file after a crash
+                # between here and journal.record() doesn't duplicate it
+                table = self.db_handler.save_table(df, filename)
+                output_file = f'{self.db_handler.db_path}:{table}'
+            else:
+                raise ValueError(f"Unsupported output format: {fmt}")
+            output_files.append(output_file)
+        return output_files
 
-def main():
-    processor = DataProcessor()
-    input_dir = os.path.join('data', 'input')
-    processor.process_files(input_dir)
+def parse_sheet_config(values):
+    """Parse FILE=SHEET pairs from the command line into a dict"""
+    sheet_config = {}
+    for value in values or []:
+        file, sep, sheet = value.partition('=')
+        if not sep or not file or not sheet:
+            raise argparse.ArgumentTypeError(f"Invalid sheet mapping '{value}', expected FILE=SHEET")
+        sheet_config[file] = sheet
+    return sheet_config
+
+def build_parser():
+    """Build the command line argument parser"""
+    parser = argparse.ArgumentParser(
+        description="Clean and organize client data from Excel files."
+    )
+    parser.add_argument('-i', '--input-dir', default=os.path.join('data', 'input'),
+                        help="directory containing the Excel files to process (default: %(default)s)")
+    parser.add_argument('-o', '--output-dir', default=os.path.join('data', 'output'),
+                        help="directory for processed files and summaries (default: %(default)s)")
+    parser.add_argument('-f', '--format', dest='formats', nargs='+', choices=OUTPUT_FORMATS,
+                        default=['xlsx'], help="output formats to write (default: xlsx)")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="number of worker processes, one file per worker (default: %(default)s)")
+    parser.add_argument('-s', '--sheet', action='append', metavar='FILE=SHEET',
+                        help="read FILE from SHEET instead of the first sheet; may be repeated")
+    parser.add_argument('--db-path',
+                        help="database file for the 'db' format (default: processed_data.<engine> in the output directory)")
+    parser.add_argument('--db-engine', choices=ENGINES, default='auto',
+                        help="embedded database for the 'db' format; auto prefers duckdb when installed (default: %(default)s)")
+    parser.add_argument('--shard-rows', type=int, default=0,
+                        help="split .xlsx sheets into shards of this many rows and process them "
+                             "across the workers; files are then handled one at a time (default: off)")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="attempts per file for transient read errors (default: %(default)s)")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignore the journal of an interrupted run and process every file")
+    parser.add_argument('--log-dir', default='logs',
+                        help="directory for processing logs (default: %(default)s)")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        sheet_config = parse_sheet_config(args.sheet)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.shard_rows < 0:
+        parser.error("--shard-rows must not be negative")
+    if args.shard_rows and args.workers == 1:
+        parser.error("--shard-rows needs --workers greater than 1")
+    if args.retries < 1:
+        parser.error("--retries must be at least 1")
+    
+    setup_logging(args.log_dir)
+    processor = DataProcessor(
+        output_dir=args.output_dir,
+        formats=args.formats,
+        workers=args.workers,
+        sheet_config=sheet_config,
+        db_path=args.db_path,
+        db_engine=args.db_engine,
+        resume=not args.restart,
+        retries=args.retries,
+        shard_rows=args.shard_rows,
+    )
+    processor.process_files(args.input_dir)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,227 @@
+import os
+import logging
+import sqlite3
+from utils import get_file_type
+
+# One table per file type, so every file of a type lands in the same table
+TABLES = {
+    'customer': 'customer_data',
+    'transaction': 'transaction_data',
+    'inventory': 'inventory_data',
+    'shipping': 'shipping_data',
+    'review': 'product_reviews',
+    'error': 'error_logs',
+    'general': 'general_data',
+}
+
+# Natural key per file type; rows are upserted on these columns, and rows
+# without one are replaced each time their source file is written
+NATURAL_KEYS = {
+    'customer': 'Email',
+    'transaction': 'TransactionID',
+    'shipping': 'ShippingID',
+}
+
+# Columns other tables are joined on; indexed whenever a table has them
+JOIN_KEYS = ('CustomerID', 'TransactionID', 'ShippingID', 'ProductID', 'Email')
+
+ENGINES = ('auto', 'sqlite', 'duckdb')
+
+# Column recording which input file each row came from
+SOURCE_COLUMN = 'SourceFile'
+
+class DatabaseHandler:
+    def __init__(self, db_path=None, engine='auto', output_dir=os.path.join('data', 'output'),
+                 batch_size=5000):
+        self.logger = logging.getLogger(__name__)
+        if engine not in ENGINES:
+            raise ValueError(f"Unsupported database engine: {engine}")
+        if engine == 'auto':
+            engine = 'duckdb' if self._duckdb_available() else 'sqlite'
+        self.engine = engine
+        self.db_path = db_path or os.path.join(output_dir, f'processed_data.{engine}')
+        self.batch_size = batch_size
+        self.connection = None
+    
+    @staticmethod
+    def _duckdb_available():
+        """Check whether the optional duckdb package is installed"""
+        try:
+            import duckdb  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    
+    def connect(self):
+        """Open the database connection on first use"""
+        if self.connection is None:
+            if self.engine == 'duckdb':
+                import duckdb
+                self.connection = duckdb.connect(self.db_path)
+            else:
+                # Autocommit mode; save_table manages one transaction per file
+                self.connection = sqlite3.connect(self.db_path, isolation_level=None)
+            self.logger.info(f"Connected to {self.engine} database {self.db_path}")
+        return self.connection
+    
+    def close(self):
+        """Close the database connection if it is open"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+    
+    def __getstate__(self):
+        # Connections can't be pickled; worker processes reconnect on demand
+        state = self.__dict__.copy()
+        state['connection'] = None
+        return state
+    
+    def save_table(self, df, filename):
+        """Write a DataFrame to the table for its file type, returning the table name
+        
+        The whole file is written in one transaction. Rows are upserted on
+        the natural key, across all files of the type; rows without one
+        (every row, for tables without a key) replace the rows the same file
+        wrote before, so writing a file again doesn't duplicate anything.
+        """
+        table = self.table_name(filename)
+        key = self.natural_key(filename, df)
+        try:
+            df = df.assign(**{SOURCE_COLUMN: os.path.basename(filename)})
+            if key:
+                # Later rows win, matching the upsert semantics across runs
+                df = df[df[key].isna() | ~df[key].duplicated(keep='last')]
+            columns = [str(col) for col in df.columns]
+            self.create_table(table, df, key)
+            
+            conn = self.connect()
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                self.delete_unkeyed_rows(table, key, os.path.basename(filename))
+                self.insert_rows(table, columns, df, key)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            
+            self.create_indexes(table, columns, key)
+            self.logger.info(f"Successfully saved {len(df)} records to table {table} in {self.db_path}")
+            return table
+        except Exception as e:
+            self.logger.error(f"Error saving to table {table} in {self.db_path}: {str(e)}")
+            raise
+    
+    @staticmethod
+    def table_name(filename):
+        """Return the table for the file's type"""
+        return TABLES[get_file_type(filename)]
+    
+    @staticmethod
+    def natural_key(filename, df):
+        """Return the natural key column for the file type, if the data has it"""
+        key = NATURAL_KEYS.get(get_file_type(filename))
+        return key if key and key in df.columns else None
+    
+    @staticmethod
+    def quote(identifier):
+        """Quote a SQL identifier"""
+        return '"' + str(identifier).replace('"', '""') + '"'
+    
+    @staticmethod
+    def column_type(series):
+        """Map a pandas dtype to a SQL column type understood by SQLite and DuckDB"""
+        import pandas as pd
+        
+        if pd.api.types.is_bool_dtype(series):
+            return 'BOOLEAN'
+        if pd.api.types.is_integer_dtype(series):
+            return 'BIGINT'
+        if pd.api.types.is_float_dtype(series):
+            return 'DOUBLE'
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return 'TIMESTAMP'
+        return 'TEXT'
+    
+    def create_table(self, table, df, key):
+        """Create the table, or add any columns it is missing"""
+        conn = self.connect()
+        definitions = []
+        for col in df.columns:
+            definition = f"{self.quote(col)} {self.column_type(df[col])}"
+            if col == key:
+                definition += " UNIQUE"
+            definitions.append(definition)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.quote(table)} ({', '.join(definitions)})")
+        
+        cursor = conn.execute(f"SELECT * FROM {self.quote(table)} LIMIT 0")
+        existing = {desc[0] for desc in cursor.description}
+        for col in df.columns:
+            if str(col) not in existing:
+                conn.execute(f"ALTER TABLE {self.quote(table)} ADD COLUMN "
+                             f"{self.quote(col)} {self.column_type(df[col])}")
+                self.logger.info(f"Added column {col} to table {table}")
+    
+    def to_rows(self, df):
+        """Convert a DataFrame to a list of tuples of plain Python values"""
+        import pandas as pd
+        
+        df = df.copy()
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+        df = df.astype(object)
+        df = df.where(df.notna(), None)
+        return list(df.itertuples(index=False, name=None))
+    
+    def to_frame(self, df, columns):
+        """Prepare a DataFrame for DuckDB to scan, with text columns as strings"""
+        df = df.copy()
+        df.columns = columns
+        for col in columns:
+            if self.column_type(df[col]) == 'TEXT':
+                df[col] = df[col].astype(object).where(df[col].isna(), df[col].astype(str))
+        return df
+    
+    def delete_unkeyed_rows(self, table, key, source_file):
+        """Remove the rows a rewrite of the file replaces rather than upserts"""
+        sql = f"DELETE FROM {self.quote(table)} WHERE {self.quote(SOURCE_COLUMN)} = ?"
+        if key:
+            sql += f" AND {self.quote(key)} IS NULL"
+        self.connect().execute(sql, [source_file])
+    
+    def insert_rows(self, table, columns, df, key):
+        """Insert rows in batches within the caller's transaction"""
+        conn = self.connect()
+        column_list = ', '.join(self.quote(col) for col in columns)
+        if self.engine == 'duckdb':
+            # DuckDB inserts row by row through executemany; scanning the
+            # DataFrame in one INSERT ... SELECT is orders of magnitude faster
+            sql = f"INSERT INTO {self.quote(table)} ({column_list}) SELECT {column_list} FROM batch_rows"
+        else:
+            placeholders = ', '.join('?' for _ in columns)
+            sql = f"INSERT INTO {self.quote(table)} ({column_list}) VALUES ({placeholders})"
+        if key:
+            updates = [f"{self.quote(col)} = excluded.{self.quote(col)}" for col in columns if col != key]
+            if updates:
+                sql += f" ON CONFLICT ({self.quote(key)}) DO UPDATE SET {', '.join(updates)}"
+            else:
+                sql += f" ON CONFLICT ({self.quote(key)}) DO NOTHING"
+        
+        for start in range(0, len(df), self.batch_size):
+            batch = df.iloc[start:start + self.batch_size]
+            if self.engine == 'duckdb':
+                conn.register('batch_rows', self.to_frame(batch, columns))
+                try:
+                    conn.execute(sql)
+                finally:
+                    conn.unregister('batch_rows')
+            else:
+                conn.executemany(sql, self.to_rows(batch))
+    
+    def create_indexes(self, table, columns, key):
+        """Index the join keys present in the table, and the source file column"""
+        conn = self.connect()
+        for col in JOIN_KEYS + (SOURCE_COLUMN,):
+            if col in columns and col != key:
+                index = self.quote(f'idx_{table}_{col.lower()}')
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {self.quote(table)} ({self.quote(col)})")
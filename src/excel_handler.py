@@ -1,5 +1,70 @@
-import pandas as pd
+import os
+import re
 import logging
+from functools import lru_cache
+
+# Tags in a worksheet's XML, with or without a namespace prefix
+ROOT_TAG = re.compile(rb'<([A-Za-z_][\w.:-]*)')
+SHEET_DATA_TAG = re.compile(rb'<((?:[\w.-]+:)?sheetData)\b[^>]*>')
+ROW_NUMBER = re.compile(rb'\sr=["\'](\d+)["\']')
+
+def _open_sheet(file_path, sheet_name):
+    """Open a workbook read-only the way pandas.read_excel does"""
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    if isinstance(sheet_name, int):
+        return workbook, workbook.worksheets[sheet_name]
+    return workbook, workbook[sheet_name]
+
+def _sheet_context(sheet):
+    """Collect the workbook data needed to parse a sheet's cells"""
+    return {
+        'shared_strings': sheet._shared_strings,
+        'epoch': sheet.parent.epoch,
+        'date_formats': sheet.parent._date_formats,
+        'timedelta_formats': sheet.parent._timedelta_formats,
+    }
+
+@lru_cache(maxsize=4)
+def _cached_sheet_context(file_path, sheet_name, mtime):
+    """Load a sheet's parsing context once per worker process and file version"""
+    workbook, sheet = _open_sheet(file_path, sheet_name)
+    try:
+        return _sheet_context(sheet)
+    finally:
+        workbook.close()
+
+def _parse_rows(xml, context, first_row):
+    """Yield (row number, values) for each row in a worksheet XML document
+    
+    Cells are converted and rows trimmed the way pandas.read_excel does.
+    """
+    from io import BytesIO
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+    from openpyxl.worksheet._reader import WorkSheetParser
+    
+    parser = WorkSheetParser(BytesIO(xml), context['shared_strings'], data_only=True,
+                             epoch=context['epoch'], date_formats=context['date_formats'],
+                             timedelta_formats=context['timedelta_formats'])
+    # Rows without an r attribute are numbered on from the previous row
+    parser.row_counter = first_row - 1
+    for row_number, cells in parser.parse():
+        values = [""] * max((cell['column'] for cell in cells), default=0)
+        for cell in cells:
+            value = cell['value']
+            if value is None:
+                value = ""
+            elif cell['data_type'] == TYPE_ERROR:
+                value = float('nan')
+            elif cell['data_type'] == TYPE_NUMERIC and int(value) == value:
+                value = int(value)
+            elif cell['data_type'] == TYPE_NUMERIC:
+                value = float(value)
+            values[cell['column'] - 1] = value
+        while values and values[-1] == "":
+            values.pop()
+        yield row_number, values
 
 class ExcelHandler:
     def __init__(self):
@@ -7,6 +72,8 @@ class ExcelHandler:
     
     def read_excel(self, file_path, sheet_name=0):
         """Read an Excel file and return a pandas DataFrame"""
+        import pandas as pd
+        
         try:
             df = pd.read_excel(file_path, sheet_name=sheet_name)
             self.logger.info(f"Successfully read {file_path}")
@@ -23,3 +90,151 @@ class ExcelHandler:
         except Exception as e:
             self.logger.error(f"Error saving to {file_path}: {str(e)}")
             raise
+    
+    def save_csv(self, df, file_path):
+        """Save DataFrame to CSV file"""
+        try:
+            df.to_csv(file_path, index=False, encoding='utf-8')
+            self.logger.info(f"Successfully saved data to {file_path}")
+        except Exception as e:
+            self.logger.error(f"Error saving to {file_path}: {str(e)}")
+            raise
+    
+    def split_sheet(self, file_path, sheet_name=0, chunk_rows=50000, block_size=1 << 20):
+        """Split a sheet's XML into chunks of whole rows without parsing their cells
+        
+        Yields (header, first_row, xml) for each chunk of up to chunk_rows
+        data rows, where xml is a worksheet document holding just those rows
+        for parse_chunk(). Only the header row is parsed here, so splitting
+        costs little more than decompressing the sheet. Raises ValueError for
+        sheets that can't be split this way.
+        
+        Relies on openpyxl internals (the workbook's archive, the sheet's
+        XML path and shared strings, and WorkSheetParser), tested with
+        openpyxl 3.1.
+        """
+        workbook, sheet = _open_sheet(file_path, sheet_name)
+        try:
+            context = _sheet_context(sheet)
+            with workbook._archive.open(sheet._worksheet_path) as src:
+                buffer = bytearray(src.read(block_size))
+                match = SHEET_DATA_TAG.search(buffer)
+                while match is None:
+                    block = src.read(block_size)
+                    if not block:
+                        raise ValueError(f"No sheet data found in {file_path}")
+                    buffer += block
+                    match = SHEET_DATA_TAG.search(buffer)
+                if match.group(0).endswith(b'/>'):
+                    return
+                
+                # Each chunk is wrapped in the sheet's own opening tags, so
+                # namespace declarations carry over
+                root_tag = ROOT_TAG.search(buffer).group(1)
+                prefix = bytes(buffer[:match.end()])
+                suffix = b'</' + match.group(1) + b'></' + root_tag + b'>'
+                
+                # Rows are found by counting their opening tags in C rather
+                # than matching each one; within sheetData no other tag
+                # starts with the row tag
+                data_tag = match.group(1)
+                row_tag = b'<' + data_tag[:-len(b'sheetData')] + b'row'
+                end_tag = b'</' + data_tag + b'>'
+                # Deleting from the front of a bytearray doesn't copy the rest
+                del buffer[:match.end()]
+                header = first_row = chunk_start = None
+                scan = rows = 0
+                while True:
+                    end = buffer.find(end_tag, scan)
+                    # Without the end tag, stop short of a tag cut off by the block
+                    stop = end if end >= 0 else max(scan, len(buffer) - len(end_tag) + 1)
+                    limit = chunk_rows if header is not None else 1
+                    skip = limit - rows if chunk_start is not None else 0
+                    count = buffer.count(row_tag, scan, stop)
+                    
+                    if count > skip:
+                        # The next chunk starts at the row after the current
+                        # chunk's last one
+                        position = scan
+                        for _ in range(skip):
+                            position = buffer.find(row_tag, position, stop) + len(row_tag)
+                        cut = buffer.find(row_tag, position, stop)
+                        tag_end = buffer.find(b'>', cut)
+                        if tag_end >= 0:
+                            if chunk_start is not None:
+                                header = yield from self._emit_chunk(header, first_row, prefix,
+                                                                     buffer[chunk_start:cut], suffix,
+                                                                     context, file_path)
+                            # A chunk is parsed on its own, so it must say where it starts
+                            number = ROW_NUMBER.search(buffer, cut, tag_end)
+                            if number is None:
+                                raise ValueError(f"Rows of {file_path} are not numbered")
+                            if first_row is not None and int(number.group(1)) <= first_row:
+                                raise ValueError(f"Rows of {file_path} are out of order")
+                            first_row = int(number.group(1))
+                            del buffer[:cut]
+                            chunk_start, rows, scan = 0, 1, tag_end - cut
+                            continue
+                    elif end >= 0:
+                        if chunk_start is not None:
+                            yield from self._emit_chunk(header, first_row, prefix,
+                                                        buffer[chunk_start:end], suffix,
+                                                        context, file_path)
+                        return
+                    else:
+                        rows += count
+                        scan = max(scan, stop - len(row_tag) + 1)
+                    
+                    block = src.read(block_size)
+                    if not block:
+                        raise ValueError(f"Sheet data in {file_path} is truncated")
+                    if chunk_start is not None:
+                        del buffer[:chunk_start]
+                        scan -= chunk_start
+                        chunk_start = 0
+                    buffer += block
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _emit_chunk(header, first_row, prefix, rows_xml, suffix, context, file_path):
+        """Yield a chunk for split_sheet(), or parse it as the header if it is the first"""
+        xml = prefix + rows_xml + suffix
+        if header is None:
+            # The header chunk is just the first row
+            if first_row != 1:
+                raise ValueError(f"First row of {file_path} is not row 1")
+            return next(_parse_rows(xml, context, first_row))[1]
+        yield header, first_row, xml
+        return header
+    
+    def parse_chunk(self, file_path, sheet_name, header, first_row, xml):
+        """Convert one chunk produced by split_sheet() to rows of cell values
+        
+        Returns (position, rows): where the rows start in a single read of
+        the sheet, and their values with missing rows filled in, trailing
+        blank rows dropped and short rows padded to the header's width.
+        """
+        context = _cached_sheet_context(file_path, sheet_name, os.path.getmtime(file_path))
+        rows = []
+        for row_number, values in _parse_rows(xml, context, first_row):
+            position = row_number - first_row
+            if position < len(rows):
+                raise ValueError(f"Rows of {file_path} are out of order at row {row_number}")
+            if not values:
+                continue
+            rows.extend([""] * len(header) for _ in range(position - len(rows)))
+            rows.append(values + [""] * (len(header) - len(values)))
+        return first_row - 2, rows
+    
+    def rows_to_frame(self, header, rows):
+        """Build a DataFrame from a sheet's header and data rows as read_excel does"""
+        from pandas.io.parsers import TextParser
+        
+        data = [header] + rows
+        width = max(map(len, data))
+        if width > len(header):
+            data = [row + [""] * (width - len(row)) for row in data]
+        # Same parser settings read_excel uses for a single header row; type
+        # inference runs here, over whole columns
+        return TextParser(data, header=0, skip_blank_lines=False).read()
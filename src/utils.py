@@ -1,28 +1,128 @@
 import os
+import time
 import logging
+from contextlib import contextmanager
 from datetime import datetime
 
-def create_directories():
+# OSErrors that retrying can't fix, e.g. a path that doesn't exist
+PERMANENT_ERRORS = (FileNotFoundError, IsADirectoryError, NotADirectoryError)
+
+# File types recognised by name, checked in this order; anything else is 'general'
+FILE_TYPES = ('customer', 'transaction', 'inventory', 'shipping', 'review', 'error')
+
+def get_file_type(filename):
+    """Classify a file by the first file type its name contains"""
+    name = os.path.basename(filename).lower()
+    for file_type in FILE_TYPES:
+        if file_type in name:
+            return file_type
+    return 'general'
+
+def create_directories(directories=None):
     """Create necessary directories if they don't exist"""
-    directories = [
-        os.path.join('data', 'input'),
-        os.path.join('data', 'output'),
-        'logs',
-    ]
+    if directories is None:
+        directories = [
+            os.path.join('data', 'input'),
+            os.path.join('data', 'output'),
+            'logs',
+        ]
     
     for directory in directories:
         if not os.path.exists(directory):
             os.makedirs(directory)
 
-def setup_logging():
+def setup_logging(log_dir='logs', level=logging.INFO):
     """Configure logging settings"""
-    log_filename = os.path.join('logs', f'processing_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+    create_directories([log_dir])
+    log_filename = os.path.join(log_dir, f'processing_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
     
     logging.basicConfig(
-        level=logging.INFO,
+        level=level,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler(log_filename),
+            logging.FileHandler(log_filename, encoding='utf-8'),
             logging.StreamHandler()
         ]
     )
+
+def init_worker_logging(queue, level):
+    """Send a worker process's log records to the parent through `queue`"""
+    from logging.handlers import QueueHandler
+    
+    root = logging.getLogger()
+    # Drop handlers inherited by forked workers so records aren't written twice
+    root.handlers[:] = [QueueHandler(queue)]
+    root.setLevel(level)
+
+@contextmanager
+def process_pool(max_workers):
+    """Yield a ProcessPoolExecutor whose workers log through this process's handlers
+    
+    Workers started with "spawn" (the default on Windows and macOS) don't
+    inherit the logging setup, so their records are forwarded over a queue.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from logging.handlers import QueueListener
+    
+    root = logging.getLogger()
+    queue = multiprocessing.Queue()
+    listener = QueueListener(queue, *root.handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker_logging,
+                                 initargs=(queue, root.level)) as executor:
+            yield executor
+    finally:
+        listener.stop()
+
+def fsync_path(path):
+    """Flush a file's contents to disk"""
+    # Opened for writing, since Windows can't flush a read-only handle
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+def fsync_directory(directory):
+    """Flush a directory's entries, e.g. a rename, to disk where supported"""
+    if os.name == 'nt':
+        # Windows can't open directories; NTFS journals renames itself
+        return
+    fd = os.open(directory or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+@contextmanager
+def atomic_path(path):
+    """Yield a temporary path next to `path` and move it into place on success
+    
+    The file and the rename are flushed to disk before returning, so once
+    the caller moves on, a crash or power loss can't leave `path` empty
+    or truncated.
+    """
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    temp_path = os.path.join(directory, f'.{stem}.{os.getpid()}.tmp{ext}')
+    try:
+        yield temp_path
+        fsync_path(temp_path)
+        os.replace(temp_path, path)
+        fsync_directory(directory)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def retry(func, *args, attempts=3, backoff=1.0, exceptions=(OSError,),
+          permanent=PERMANENT_ERRORS, **kwargs):
+    """Call func, retrying transient errors with exponential backoff"""
+    logger = logging.getLogger(__name__)
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except exceptions as e:
+            if attempt == attempts or isinstance(e, permanent):
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            logger.warning(f"Attempt {attempt} of {attempts} failed: {str(e)}; retrying in {delay:.1f}s")
+            time.sleep(delay)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# The modules in src/ import each other by bare name, as when run as scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    """A small input directory with one workbook per keyed and keyless file type"""
+    import pandas as pd
+
+    directory = tmp_path / 'input'
+    directory.mkdir()
+    pd.DataFrame({
+        'CustomerID': ['C1', 'C2', 'C3'],
+        'Email': ['A@example.com', 'b@example.com', 'a@example.com'],
+        'Phone': ['5551234567', None, '15557654321'],
+    }).to_excel(directory / 'customer_data.xlsx', index=False)
+    pd.DataFrame({
+        'TransactionID': ['T1', 'T2', None],
+        'CustomerID': ['C1', 'C2', 'C3'],
+        'Amount': [10.005, 20.5, 30.0],
+        'TransactionDate': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03']),
+    }).to_excel(directory / 'transaction_data.xlsx', index=False)
+    pd.DataFrame({
+        'ProductID': ['P1', 'P2'],
+        'InStock': [5, 50],
+        'ReorderPoint': [10, 10],
+    }).to_excel(directory / 'inventory_data.xlsx', index=False)
+    pd.DataFrame({
+        'ProductID': ['P1', 'P1', 'P2'],
+        'Rating': [5, 9, 3],
+        'ReviewText': ['Great  product', 'teh best', None],
+    }).to_excel(directory / 'product_reviews.xlsx', index=False)
+    return str(directory)
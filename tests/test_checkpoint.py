@@ -0,0 +1,122 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from checkpoint import ProcessingJournal
+from data_processor import JOURNAL_FILE, DataProcessor
+from utils import atomic_path, retry
+
+
+def summary_files(output_dir):
+    return sorted(f for f in os.listdir(output_dir) if f.startswith('processing_summary_'))
+
+
+def test_resume_after_failed_file(tmp_path, input_dir):
+    output_dir = str(tmp_path / 'output')
+    broken = os.path.join(input_dir, 'broken_data.xlsx')
+    with open(broken, 'w') as f:
+        f.write('not a workbook')
+
+    processed = DataProcessor(output_dir=output_dir, formats=['csv'], retry_backoff=0).process_files(input_dir)
+    assert 'broken_data.xlsx' not in processed
+    with open(os.path.join(output_dir, JOURNAL_FILE), encoding='utf-8') as f:
+        assert sorted(json.load(f)) == sorted(processed)
+
+    # Once the file is fixed, only it is processed again
+    os.remove(broken)
+    pd.DataFrame({'Value': [' x ', 'y']}).to_excel(broken, index=False)
+    processed = DataProcessor(output_dir=output_dir, formats=['csv']).process_files(input_dir)
+    assert list(processed) == ['broken_data.xlsx']
+    assert not os.path.exists(os.path.join(output_dir, JOURNAL_FILE))
+
+    # The summary still covers files completed by the first run
+    with open(os.path.join(output_dir, summary_files(output_dir)[-1]), encoding='utf-8') as f:
+        assert f.read().count('File: ') == 5
+
+
+def test_resume_after_crash(tmp_path, input_dir, monkeypatch):
+    output_dir = str(tmp_path / 'output')
+    processor = DataProcessor(output_dir=output_dir, formats=['csv'])
+    commit_file = processor.commit_file
+    commits = []
+
+    def crash_on_third(journal, file, *args):
+        if len(commits) == 2:
+            raise KeyboardInterrupt
+        commits.append(file)
+        return commit_file(journal, file, *args)
+
+    monkeypatch.setattr(processor, 'commit_file', crash_on_third)
+    with pytest.raises(KeyboardInterrupt):
+        processor.process_files(input_dir)
+
+    processed = DataProcessor(output_dir=output_dir, formats=['csv']).process_files(input_dir)
+    files = sorted(f for f in os.listdir(input_dir))
+    assert commits == files[:2]
+    assert sorted(processed) == files[2:]
+
+
+def test_journal_ignores_changed_files(tmp_path):
+    source = tmp_path / 'data.xlsx'
+    source.write_text('v1')
+    journal = ProcessingJournal(str(tmp_path / JOURNAL_FILE))
+    journal.record('data.xlsx', str(source), ['xlsx'], [], [])
+
+    reloaded = ProcessingJournal(str(tmp_path / JOURNAL_FILE))
+    assert reloaded.is_complete('data.xlsx', str(source), ['xlsx'])
+    assert not reloaded.is_complete('data.xlsx', str(source), ['xlsx', 'db'])
+    source.write_text('version 2')
+    assert not reloaded.is_complete('data.xlsx', str(source), ['xlsx'])
+
+
+def test_atomic_path_keeps_old_file_on_failure(tmp_path):
+    path = tmp_path / 'out.csv'
+    path.write_text('old')
+    with pytest.raises(RuntimeError):
+        with atomic_path(str(path)) as temp_path:
+            with open(temp_path, 'w') as f:
+                f.write('partial')
+            raise RuntimeError
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['out.csv']
+
+
+def test_retry_transient_errors_only():
+    calls = []
+
+    def locked():
+        calls.append(1)
+        if len(calls) < 3:
+            raise PermissionError('locked')
+        return 'ok'
+
+    assert retry(locked, attempts=3, backoff=0) == 'ok'
+
+    calls.clear()
+
+    def missing():
+        calls.append(1)
+        raise FileNotFoundError('missing')
+
+    with pytest.raises(FileNotFoundError):
+        retry(missing, attempts=3, backoff=0)
+    assert len(calls) == 1
+
+
+def test_atomic_path_syncs_before_and_after_rename(tmp_path, monkeypatch):
+    import utils
+
+    events = []
+    fsync, replace = os.fsync, os.replace
+    monkeypatch.setattr(utils.os, 'fsync', lambda fd: events.append('fsync') or fsync(fd))
+    monkeypatch.setattr(utils.os, 'replace', lambda *args: events.append('replace') or replace(*args))
+
+    path = tmp_path / 'out.csv'
+    with atomic_path(str(path)) as temp_path:
+        with open(temp_path, 'w') as f:
+            f.write('new')
+    assert path.read_text() == 'new'
+    expected = ['fsync', 'replace', 'fsync'] if os.name != 'nt' else ['fsync', 'replace']
+    assert events == expected
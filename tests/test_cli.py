@@ -0,0 +1,42 @@
+import argparse
+import os
+import subprocess
+import sys
+
+import pytest
+
+from data_processor import main, parse_sheet_config
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def test_parse_sheet_config():
+    assert parse_sheet_config(['a.xlsx=Orders', 'b.xlsx=x=y']) == {'a.xlsx': 'Orders', 'b.xlsx': 'x=y'}
+    assert parse_sheet_config(None) == {}
+
+
+@pytest.mark.parametrize('value', ['x', '=y', 'x='])
+def test_parse_sheet_config_rejects_bad_mappings(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_sheet_config([value])
+
+
+def test_help_exits_cleanly(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        main(['--help'])
+    assert exc_info.value.code == 0
+    assert '--shard-rows' in capsys.readouterr().out
+
+
+def test_import_does_not_load_pandas():
+    # Run in a fresh interpreter, since the test session has already imported pandas
+    code = "import sys, data_processor; sys.exit('pandas' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr or "importing data_processor loaded pandas"
+
+
+def test_shard_rows_needs_workers(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        main(['--shard-rows', '50000'])
+    assert exc_info.value.code == 2
+    assert '--workers' in capsys.readouterr().err
@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+from data_processor import DataProcessor
+from db_handler import DatabaseHandler
+
+ENGINES = [
+    'sqlite',
+    pytest.param('duckdb', marks=pytest.mark.skipif(
+        not DatabaseHandler._duckdb_available(), reason="duckdb is not installed")),
+]
+
+
+def row_counts(handler, tables):
+    conn = handler.connect()
+    return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_keyless_table_is_replaced(tmp_path, engine):
+    handler = DatabaseHandler(str(tmp_path / 'test.db'), engine=engine)
+    df = pd.DataFrame({'ProductID': ['P1', 'P2'], 'InStock': [5, 50]})
+    handler.save_table(df, 'inventory_data.xlsx')
+    handler.save_table(df.assign(InStock=[6, 60]), 'inventory_data.xlsx')
+
+    rows = handler.connect().execute('SELECT "ProductID", "InStock" FROM inventory_data ORDER BY 1').fetchall()
+    assert rows == [('P1', 6), ('P2', 60)]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_keyed_table_is_upserted(tmp_path, engine):
+    handler = DatabaseHandler(str(tmp_path / 'test.db'), engine=engine, batch_size=2)
+    df = pd.DataFrame({
+        'TransactionID': ['T1', 'T2', None, 'T1'],
+        'Amount': [1.0, 2.0, 3.0, 4.0],
+        'TransactionDate': pd.to_datetime(['2024-01-01', None, '2024-01-03', '2024-01-04']),
+    })
+    handler.save_table(df, 'transaction_data.xlsx')
+    handler.save_table(df.iloc[:2].assign(Amount=[5.0, 6.0]), 'transaction_data.xlsx')
+
+    rows = handler.connect().execute(
+        'SELECT "TransactionID", "Amount" FROM transaction_data ORDER BY 1 NULLS LAST').fetchall()
+    # The rewrite updates T1 and T2 and replaces the row without a key
+    assert rows == [('T1', 5.0), ('T2', 6.0)]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_pipeline_twice_keeps_row_counts(tmp_path, input_dir, engine):
+    tables = ['customer_data', 'transaction_data', 'inventory_data', 'product_reviews']
+    counts = []
+    for _ in range(2):
+        processor = DataProcessor(output_dir=str(tmp_path / 'output'), formats=['db'],
+                                  db_engine=engine, resume=False)
+        processor.process_files(input_dir)
+        counts.append(row_counts(processor.db_handler, tables))
+        processor.db_handler.close()
+
+    assert counts[0] == counts[1]
+    assert counts[0] == {'customer_data': 2, 'transaction_data': 3,
+                         'inventory_data': 2, 'product_reviews': 3}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_files_of_one_type_share_a_table(tmp_path, engine):
+    handler = DatabaseHandler(str(tmp_path / 'test.db'), engine=engine)
+    june_1 = pd.DataFrame({'TransactionID': ['T1', 'T2', None], 'Amount': [1.0, 2.0, 3.0]})
+    june_2 = pd.DataFrame({'TransactionID': ['T2', 'T3', None], 'Amount': [4.0, 5.0, 6.0]})
+    assert handler.save_table(june_1, 'transaction_data_0601.xlsx') == 'transaction_data'
+    assert handler.save_table(june_2, 'transaction_data_0602.xlsx') == 'transaction_data'
+    # Rewriting one file replaces only its own rows without a key
+    handler.save_table(june_1.assign(Amount=[7.0, 8.0, 9.0]), 'transaction_data_0601.xlsx')
+
+    rows = handler.connect().execute(
+        'SELECT "TransactionID", "Amount", "SourceFile" FROM transaction_data ORDER BY 1 NULLS LAST, 2').fetchall()
+    assert rows == [
+        ('T1', 7.0, 'transaction_data_0601.xlsx'),
+        ('T2', 8.0, 'transaction_data_0601.xlsx'),
+        ('T3', 5.0, 'transaction_data_0602.xlsx'),
+        (None, 6.0, 'transaction_data_0602.xlsx'),
+        (None, 9.0, 'transaction_data_0601.xlsx'),
+    ]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_keyless_files_of_one_type_share_a_table(tmp_path, engine):
+    handler = DatabaseHandler(str(tmp_path / 'test.db'), engine=engine)
+    for name in ('inventory_east.xlsx', 'inventory_west.xlsx', 'inventory_east.xlsx'):
+        handler.save_table(pd.DataFrame({'ProductID': ['P1', 'P2'], 'InStock': [5, 50]}), name)
+
+    rows = handler.connect().execute(
+        'SELECT "SourceFile", COUNT(*) FROM inventory_data GROUP BY 1 ORDER BY 1').fetchall()
+    assert rows == [('inventory_east.xlsx', 2), ('inventory_west.xlsx', 2)]
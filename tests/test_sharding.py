@@ -0,0 +1,112 @@
+import pandas as pd
+import pytest
+
+from data_processor import DataProcessor
+
+SHARD_ROWS = 30
+
+
+def process(file_path, **kwargs):
+    processor = DataProcessor(formats=['csv'], **kwargs)
+    return processor.process_file(file_path.name, str(file_path.parent))
+
+
+def process_both_ways(file_path):
+    single = process(file_path)
+    sharded = process(file_path, workers=2, shard_rows=SHARD_ROWS)
+    return single, sharded
+
+
+def test_transactions_with_string_dates(tmp_path):
+    rows = 100
+    df = pd.DataFrame({
+        'TransactionID': [f'T{i:04d}' for i in range(rows)],
+        'CustomerID': [f'C{i % 7}' for i in range(rows)],
+        'Amount': [i * 1.005 for i in range(rows)],
+        'TransactionDate': [f'2024-01-{i % 28 + 1:02d}' for i in range(rows)],
+        # Empty except in the last shard, so other shards see it as all-NaN
+        'Note': [None] * 90 + [' late '] * 10,
+    })
+    # A blank row inside a shard turns integer columns into floats
+    df.loc[45] = None
+    file_path = tmp_path / 'transaction_data.xlsx'
+    df.to_excel(file_path, index=False)
+
+    single, sharded = process_both_ways(file_path)
+    assert pd.api.types.is_datetime64_any_dtype(single['TransactionDate'])
+    pd.testing.assert_frame_equal(sharded, single)
+
+
+def test_date_format_is_inferred_over_the_whole_sheet(tmp_path):
+    # The first shard alone parses as month-first, the second only as day-first
+    dates = ['01/02/2024'] * SHARD_ROWS + ['13/01/2024'] * SHARD_ROWS
+    file_path = tmp_path / 'transaction_data.xlsx'
+    pd.DataFrame({'TransactionID': range(len(dates)), 'TransactionDate': dates}).to_excel(file_path, index=False)
+
+    single, sharded = process_both_ways(file_path)
+    assert single is None
+    assert sharded is None
+
+
+def test_customers_deduplicated_across_shards(tmp_path):
+    emails = [f'user{i % 40}@example.com' for i in range(100)]
+    file_path = tmp_path / 'customer_data.xlsx'
+    pd.DataFrame({
+        'CustomerID': [f'C{i}' for i in range(100)],
+        'Email': [email.upper() if i % 3 else email for i, email in enumerate(emails)],
+        'Phone': ['5551234567'] * 100,
+    }).to_excel(file_path, index=False)
+
+    single, sharded = process_both_ways(file_path)
+    assert len(single) == 40
+    pd.testing.assert_frame_equal(sharded, single)
+
+
+@pytest.mark.parametrize('shard_rows', [0, SHARD_ROWS])
+def test_small_sheet_is_read_in_one_piece(tmp_path, shard_rows):
+    file_path = tmp_path / 'inventory_data.xlsx'
+    pd.DataFrame({'ProductID': ['P1', 'P2'], 'InStock': [5, 50]}).to_excel(file_path, index=False)
+    df = process(file_path, workers=2, shard_rows=shard_rows)
+    assert df['InStock'].tolist() == [5, 50]
+
+
+def test_read_sharded_matches_read_excel(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['ID', 'Amount', 'Flag', 'Code'])
+    for row in range(2, 120):
+        # Leave blank rows on either side of the first shard boundary
+        if row in (31, 32, 33):
+            continue
+        # Codes are numbers stored as text, except in the last shard, so only
+        # a read of the whole column can tell they must stay text
+        code = str(row) if row < 100 else f'X{row}'
+        values = [row, row * 1.5, row % 2 == 0, code] if row != 50 else [row]
+        for column, value in enumerate(values, 1):
+            sheet.cell(row=row, column=column, value=value)
+    # A row wider than the header and trailing blank rows
+    sheet.cell(row=140, column=6, value='extra')
+    sheet.cell(row=150, column=1, value=None)
+    file_path = tmp_path / 'ledger.xlsx'
+    workbook.save(file_path)
+
+    processor = DataProcessor(workers=2, shard_rows=SHARD_ROWS)
+    df = processor.read_sharded(str(file_path), 0)
+    pd.testing.assert_frame_equal(df, pd.read_excel(file_path))
+
+
+@pytest.mark.parametrize('error', [AttributeError, ImportError])
+def test_openpyxl_changes_fall_back_to_a_normal_read(tmp_path, monkeypatch, error):
+    import excel_handler
+
+    def changed_internals(*args):
+        raise error('openpyxl internals changed')
+
+    monkeypatch.setattr(excel_handler, '_sheet_context', changed_internals)
+    file_path = tmp_path / 'inventory_data.xlsx'
+    pd.DataFrame({'ProductID': [f'P{i}' for i in range(100)], 'InStock': range(100)}).to_excel(file_path, index=False)
+
+    df = process(file_path, workers=2, shard_rows=SHARD_ROWS)
+    assert df['InStock'].tolist() == list(range(100))